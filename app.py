@@ -1,18 +1,22 @@
 from datetime import datetime
 import logging.config
-from flask import Flask, request, jsonify, send_file
+import math
+from flask import Flask, request, jsonify, send_file, Response
 import threading
 import os
 import signal
 import logging
 import boto3
 from data_purge_manager import DataPurger
+from lifecycle_manager import LifecycleManager
 from loggerConf import setlogger
 from models.models import UploadMon
-from uploader import graceful_shutdown, watch_folder_in_thread
+from profiler import MIN_SAMPLE_INTERVAL, profiler, recent_jobs, thread_dump
+from scripts_config import ScriptConfig as Config
+from uploader import graceful_shutdown, mv_service, watch_folder_in_thread
 import configparser
 from models.connection import engine
-from sqlalchemy.ext.declarative import declarative_base
+from models.models import Base
 from models.connection import session
 
 app = Flask(__name__)
@@ -22,8 +26,9 @@ purge_folders = []
 data_purger = None
 memory_thread = None
 purge_thread = None
-upload_threads = []
-shutdown_event = threading.Event()
+upload_watchers = {}  # folder -> (thread, stop_event)
+draining_watchers = {}  # folder -> thread of a removed folder still finishing its uploads
+watchers_lock = threading.Lock()
 
 @app.route('/list_directories', methods=['GET'])
 def list_directories():
@@ -56,7 +61,7 @@ def update_folders():
         row.update_date_time = datetime.now()
     logging.info(f"Updated folders: upload={upload_folders}, purge={purge_folders}")
 
-    # Restart all monitoring based on new folders
+    # Add/remove watches for changed folders only
     restart_monitoring()
     return jsonify({"message": "Folders updated successfully"}), 200
 
@@ -103,7 +108,7 @@ def list_s3_objects():
         # Return list of object details
         object_data = [{'Key': obj['Key'], 'LastModified': obj['LastModified']} for obj in all_objects]
         logging.info(f"Found {len(object_data)} objects in S3 bucket")
-        logging.info(f"Object data: {object_data}")
+        logging.debug("Object data: %s", object_data)
         return jsonify(object_data)
 
     except Exception as e:
@@ -178,32 +183,129 @@ def get_cred():
         return jsonify({"error": "No credentials found"}), 404
 
 def restart_monitoring():
-    global data_purger, memory_thread, purge_thread, upload_threads, shutdown_event
-    shutdown_event.set()  # Signal existing threads to stop
-
-    # Restart purger with new folders
-    data_purger = DataPurger(purge_folders)
-    memory_thread = threading.Thread(target=data_purger.monitor_memory_usage, daemon=True)
-    purge_thread = threading.Thread(target=data_purger.handle_data_purge, daemon=True)
-    memory_thread.start()
-    purge_thread.start()
+    """Bring watchers and purger in line with the configured folders.
+
+    Only folders that were added or removed are touched; watchers of unchanged
+    folders and their in-flight uploads keep running.
+    """
+    global data_purger, memory_thread, purge_thread
+
+    if data_purger is None:
+        data_purger = DataPurger(purge_folders)
+        memory_thread = threading.Thread(target=data_purger.monitor_memory_usage, name="purger:memory", daemon=True)
+        purge_thread = threading.Thread(target=data_purger.handle_data_purge, name="purger:purge", daemon=True)
+        memory_thread.start()
+        purge_thread.start()
+    else:
+        data_purger.src_dirs = list(purge_folders)
 
-    # Restart uploader threads if enabled
     is_enabled = bool(os.environ.get("UPLOAD_ENABLED", False))
     logging.info(f"UPLOAD_ENABLED: {is_enabled}")
-    if is_enabled:
-        logging.info("Starting uploader service with dynamic folders...")
-        for thread in upload_threads:
-            if thread.is_alive():
-                thread.join()  # Ensure old threads are finished
-        upload_threads = [threading.Thread(target=watch_folder_in_thread, args=(folder, shutdown_event)) for folder in upload_folders]
-        shutdown_event.clear()
-        for thread in upload_threads:
+    if not is_enabled:
+        return
+
+    with watchers_lock:
+        for folder, thread in list(draining_watchers.items()):
+            if not thread.is_alive():
+                del draining_watchers[folder]
+
+        # Stop watchers of removed folders without waiting on their in-flight uploads
+        for folder in set(upload_watchers) - set(upload_folders):
+            thread, stop_event = upload_watchers.pop(folder)
+            stop_event.set()
+            draining_watchers[folder] = thread
+            logging.info(f"Stopping watcher for removed folder: {folder}")
+
+        for folder in upload_folders:
+            thread, _ = upload_watchers.get(folder, (None, None))
+            if thread is not None and thread.is_alive():
+                continue
+            previous = draining_watchers.pop(folder, None)
+            stop_event = threading.Event()
+            thread = threading.Thread(target=watch_after, args=(previous, folder, stop_event),
+                                      name=f"watcher:{folder}")
+            upload_watchers[folder] = (thread, stop_event)
             thread.start()
+            logging.info(f"Started watcher for folder: {folder}")
+
+def watch_after(previous, folder, stop_event):
+    # A re-added folder must not be watched twice, so wait for its old watcher to drain first
+    if previous is not None:
+        previous.join()
+    if not stop_event.is_set():
+        watch_folder_in_thread(folder, stop_event)
+
+@app.route('/config', methods=['GET'])
+def get_config():
+    return jsonify(Config.tunables())
+
+@app.route('/config', methods=['POST'])
+def update_config():
+    data = request.get_json() or {}
+    try:
+        applied = Config.update(data)
+    except (ValueError, TypeError, OverflowError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": "Config updated successfully", "applied": applied}), 200
+
+@app.before_request
+def guard_debug_endpoints():
+    if request.path.startswith('/debug/') and not Config.DEBUG_ENDPOINTS_ENABLED:
+        return jsonify({"error": "Debug endpoints are disabled"}), 404
+
+@app.route('/debug/profile/start', methods=['POST'])
+def start_profile():
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', 30))
+        interval = float(data.get('interval', 0.01))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    # max()/min() pass NaN straight through, which would make the sampler spin
+    if not (math.isfinite(seconds) and math.isfinite(interval)) or seconds <= 0:
+        return jsonify({"error": "seconds and interval must be finite, seconds must be positive"}), 400
+
+    seconds = min(seconds, Config.PROFILE_MAX_SECONDS)
+    interval = min(max(interval, MIN_SAMPLE_INTERVAL), seconds)
+
+    try:
+        profiler.start(seconds, interval)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"message": "Profiler started", "seconds": seconds, "interval": interval}), 200
+
+@app.route('/debug/profile/stop', methods=['POST'])
+def stop_profile():
+    profiler.stop()
+    return jsonify(profiler.status()), 200
+
+@app.route('/debug/profile', methods=['GET'])
+def get_profile():
+    if request.args.get('status'):
+        return jsonify(profiler.status())
+    # Collapsed stacks, feed to flamegraph.pl or load in speedscope
+    return Response(profiler.collapsed(), mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=profile.folded'})
+
+@app.route('/debug/jobs', methods=['GET'])
+def get_jobs():
+    return jsonify(recent_jobs())
+
+@app.route('/debug/threads', methods=['GET'])
+def get_threads():
+    return Response(thread_dump(), mimetype='text/plain')
+
+def reload_config(_, __):
+    logging.info("Received SIGHUP. Reloading runtime config.")
+    try:
+        Config.reload()
+    except Exception as e:
+        logging.exception(f"Failed to reload runtime config: {e}")
 
 if __name__ == "__main__":
     setlogger()
     signal.signal(signal.SIGINT, graceful_shutdown)
+    signal.signal(signal.SIGHUP, reload_config)
     logging.info(f"UPLOAD_ENABLED: {bool(os.environ.get('UPLOAD_ENABLED', False))}")
 
     credentials = read_aws_credentials()
@@ -216,7 +318,13 @@ if __name__ == "__main__":
         logging.error("Failed to read credentials. Exiting.")
 
     # Create all tables in the engine.
-    Base = declarative_base()
     Base.metadata.create_all(engine)
 
-    app.run(host='0.0.0.0', debug=True, port=5000)
+    # Expiry doesn't depend on the watched folders, so it runs from startup
+    lifecycle_manager = LifecycleManager(mv_service)
+    lifecycle_thread = threading.Thread(target=lifecycle_manager.handle_lifecycle, name="lifecycle", daemon=True)
+    lifecycle_thread.start()
+
+    # No reloader: it runs this block in a second process, and SIGHUP sent to the container's
+    # PID 1 would only reach the reloader parent instead of the process serving requests
+    app.run(host='0.0.0.0', debug=True, port=5000, use_reloader=False)
@@ -0,0 +1,146 @@
+import os
+import logging
+import time
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
+from scripts_config import ScriptConfig as Config
+from models.connection import Session
+from models.models import UploadedObject
+
+
+def storage_class_for(src):
+    # Longest matching folder rule wins, so nested folders can override their parent
+    src = os.path.abspath(src)
+    best_match = ""
+    storage_class = Config.DEFAULT_STORAGE_CLASS
+    for folder, folder_class in Config.STORAGE_CLASS_RULES.items():
+        folder = os.path.abspath(folder)
+        if src.startswith(folder + os.sep) and len(folder) > len(best_match):
+            best_match, storage_class = folder, folder_class
+    return storage_class
+
+
+def record_upload(key, storage_class, size):
+    """Add or refresh an uploaded object in the local index"""
+    session = Session()
+    try:
+        row = session.query(UploadedObject).filter_by(key=key).first()
+        if row is None:
+            row = UploadedObject(key=key)
+            session.add(row)
+        row.storage_class = storage_class
+        row.size = size
+        row.upload_date_time = datetime.now().isoformat()
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logging.error(f"Error indexing uploaded object {key}: {e}")
+    finally:
+        session.close()
+
+
+class LifecycleManager:
+    """Transitions and expires uploaded objects by age, driven from the local index"""
+
+    def __init__(self, mv_service):
+        self.mv_service = mv_service
+
+    def next_batch(self, session, last_id, *criteria):
+        # Keyset pagination on id, so rows that keep failing don't block the ones after them
+        return (session.query(UploadedObject)
+                .filter(UploadedObject.id > last_id, *criteria)
+                .order_by(UploadedObject.id)
+                .limit(Config.LIFECYCLE_BATCH_SIZE)
+                .all())
+
+    def expire_objects(self):
+        if Config.ARCHIVE_PURGE_INTERVAL <= 0:
+            return
+        cutoff = (datetime.now() - timedelta(days=Config.ARCHIVE_PURGE_INTERVAL)).isoformat()
+        session = Session()
+        try:
+            last_id = 0
+            while True:
+                rows = self.next_batch(session, last_id, UploadedObject.upload_date_time < cutoff)
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                response = self.mv_service.s3.delete_objects(
+                    Bucket=Config.BUCKET_NAME,
+                    Delete={"Objects": [{"Key": row.key} for row in rows], "Quiet": True},
+                )
+                failed = {error["Key"] for error in response.get("Errors", [])}
+                for error in response.get("Errors", []):
+                    logging.warning(f"Failed to expire {error['Key']}: {error.get('Message')}")
+
+                # Failed keys stay indexed and are retried on the next run
+                for row in rows:
+                    if row.key not in failed:
+                        session.delete(row)
+                session.commit()
+                logging.info(f"Expired {len(rows) - len(failed)} objects older than {Config.ARCHIVE_PURGE_INTERVAL} days")
+        except Exception as e:
+            session.rollback()
+            logging.error(f"Error expiring objects: {e}")
+        finally:
+            session.close()
+
+    def transition_objects(self):
+        if Config.ARCHIVE_TRANSITION_DAYS <= 0:
+            return
+        cutoff = (datetime.now() - timedelta(days=Config.ARCHIVE_TRANSITION_DAYS)).isoformat()
+        session = Session()
+        try:
+            last_id = 0
+            while True:
+                rows = self.next_batch(session, last_id,
+                                       UploadedObject.upload_date_time < cutoff,
+                                       UploadedObject.storage_class != Config.ARCHIVE_STORAGE_CLASS)
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                transitioned = 0
+                for row in rows:
+                    if self.transition_object(session, row):
+                        transitioned += 1
+                session.commit()
+                logging.info(f"Transitioned {transitioned} objects to {Config.ARCHIVE_STORAGE_CLASS}")
+        except Exception as e:
+            # Rows copied before the failure are re-copied next run, which is harmless
+            session.rollback()
+            logging.error(f"Error transitioning objects: {e}")
+        finally:
+            session.close()
+
+    def transition_object(self, session, row):
+        try:
+            # Server-side copy onto itself; the object data never leaves S3
+            self.mv_service.s3.copy(
+                {"Bucket": Config.BUCKET_NAME, "Key": row.key},
+                Config.BUCKET_NAME,
+                row.key,
+                ExtraArgs={"StorageClass": Config.ARCHIVE_STORAGE_CLASS, "MetadataDirective": "COPY"},
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                logging.warning(f"{row.key} no longer exists in S3, dropping it from the index")
+                session.delete(row)
+            else:
+                # Left as is and retried on the next run
+                logging.warning(f"Failed to transition {row.key}: {e}")
+            return False
+        row.storage_class = Config.ARCHIVE_STORAGE_CLASS
+        return True
+
+    def handle_lifecycle(self):
+        while True:
+            try:
+                # Expire first so objects about to be deleted aren't copied
+                self.expire_objects()
+                self.transition_objects()
+            except Exception as e:
+                logging.error(f"Error handling lifecycle: {e}")
+            time.sleep(Config.LIFECYCLE_CHECK_INTERVAL)
@@ -0,0 +1,177 @@
+import gzip
+import logging
+import os
+import re
+import stat
+import time
+from datetime import datetime
+from scripts_config import ScriptConfig as Config
+from models.connection import Session
+from models.models import LogOffset
+
+# app.log as well as rotated copies like app.log.1
+LOG_FILE_PATTERN = re.compile(r"\.log(\.\d+)?$")
+
+# Upper bound on how often the folder tree is walked, in seconds
+LOG_SHIP_POLL_INTERVAL = 5
+
+
+def is_shipped_log(path):
+    return Config.LOG_SHIP_ENABLED and LOG_FILE_PATTERN.search(os.path.basename(path).lower()) is not None
+
+
+def new_epoch():
+    return int(time.time() * 1000)
+
+
+def raise_error(error):
+    raise error
+
+
+def ship_logs(folder_path, mv_service, stop_event):
+    """Thread target: poll the folder for new log bytes until stop_event is set"""
+    try:
+        shipper = LogShipper(folder_path, mv_service, stop_event)
+    except Exception as e:
+        logging.exception(f"Failed to start log shipping for {folder_path}: {e}")
+        return
+    try:
+        while not stop_event.is_set():
+            shipper.ship_pending()
+            stop_event.wait(min(Config.LOG_SHIP_INTERVAL, LOG_SHIP_POLL_INTERVAL))
+    finally:
+        shipper.close()
+
+
+class LogShipper:
+    """Ships the appended tail of .log files in a folder as gzip segments.
+
+    Offsets are tracked per inode, so a file renamed by rotation keeps its
+    offset and only its unshipped remainder is sent. Segments are uploaded to
+    my_backup/logs/<name>/<device>-<inode>-<epoch>/<start>-<end>.gz, where
+    epoch is reset when the file is first seen or truncated, so a restarted
+    file never overwrites what was already shipped. Concatenating the segments
+    of one prefix in order gives back the file as a single gzip stream.
+    """
+
+    def __init__(self, folder_path, mv_service, stop_event):
+        self.folder_path = folder_path
+        self.mv_service = mv_service
+        self.stop_event = stop_event
+        self.session = Session()
+        self.offsets = {(row.device, row.inode): row
+                        for row in self.session.query(LogOffset).filter_by(folder=folder_path)}
+        self.last_shipped = {}
+
+    def ship_pending(self):
+        # Nothing may escape, or the shipper thread dies and the folder's logs stop shipping
+        try:
+            seen = set()
+            for path in self.log_files():
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+
+                seen.add((st.st_dev, st.st_ino))
+                try:
+                    self.ship_file(path, st)
+                except Exception as e:
+                    # Offset was not advanced, the same range is retried on the next poll
+                    self.session.rollback()
+                    logging.warning(f"Failed to ship {path}: {e}. Retrying on next poll.")
+
+            self.forget_missing(seen)
+        except Exception as e:
+            self.session.rollback()
+            logging.warning(f"Failed to poll logs in {self.folder_path}: {e}. Retrying on next poll.")
+
+    def log_files(self):
+        # Same tree as the recursive watch; a listing error aborts the poll rather than
+        # making the files below it look deleted
+        for dir_path, _, filenames in os.walk(self.folder_path, onerror=raise_error):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                if is_shipped_log(path):
+                    yield path
+
+    def ship_file(self, path, st):
+        file_id = (st.st_dev, st.st_ino)
+        row = self.offsets.get(file_id)
+        if row is None:
+            row = LogOffset(device=st.st_dev, inode=st.st_ino, folder=self.folder_path,
+                            name=os.path.basename(path), epoch=new_epoch(), offset=0)
+            self.session.add(row)
+            self.offsets[file_id] = row
+        if row.path != path:
+            # Commit new and renamed files up front so a failed upload's rollback keeps them
+            row.path = path
+            self.session.commit()
+
+        if st.st_size < row.offset:
+            logging.warning(f"{path} was truncated, shipping from the start")
+            row.epoch = new_epoch()
+            row.offset = 0
+
+        idle = time.time() - st.st_mtime
+        pending = st.st_size - row.offset
+        if pending == 0:
+            self.delete_if_idle(path, idle, row)
+            return
+
+        due = time.time() - self.last_shipped.get(file_id, 0) >= Config.LOG_SHIP_INTERVAL
+        if pending < Config.LOG_SHIP_SEGMENT_BYTES and not due:
+            return
+
+        with open(path, "rb") as log_file:
+            if os.fstat(log_file.fileno()).st_ino != st.st_ino:
+                # Rotated between stat and open, picked up on the next poll
+                return
+
+            # Stop between segments once the folder is removed; the rest ships when it's watched again
+            while row.offset < st.st_size and not self.stop_event.is_set():
+                log_file.seek(row.offset)
+                data = log_file.read(min(Config.LOG_SHIP_SEGMENT_BYTES, st.st_size - row.offset))
+                if not data:
+                    break
+
+                # Keep lines whole while the file is still being written to
+                if idle < Config.LOG_SHIP_INTERVAL:
+                    cut = data.rfind(b"\n") + 1
+                    if cut:
+                        data = data[:cut]
+                    elif len(data) < Config.LOG_SHIP_SEGMENT_BYTES:
+                        break
+
+                start, end = row.offset, row.offset + len(data)
+                dst = f"my_backup/logs/{row.name}/{row.device}-{row.inode}-{row.epoch}/{start:016d}-{end:016d}.gz"
+                self.mv_service.upload_segment(path, gzip.compress(data), dst)
+
+                row.offset = end
+                row.update_date_time = datetime.now().isoformat()
+                self.session.commit()
+
+        self.last_shipped[file_id] = time.time()
+
+    def delete_if_idle(self, path, idle, row):
+        if Config.LOG_SHIP_IDLE_DELETE <= 0 or idle < Config.LOG_SHIP_IDLE_DELETE:
+            return
+        os.remove(path)
+        logging.info(f"Removed fully shipped idle log file: {path}")
+        self.forget((row.device, row.inode))
+
+    def forget_missing(self, seen):
+        # Drop offsets of files that are gone so a reused inode starts from zero
+        for file_id in set(self.offsets) - seen:
+            self.forget(file_id)
+
+    def forget(self, file_id):
+        row = self.offsets.pop(file_id)
+        self.last_shipped.pop(file_id, None)
+        self.session.delete(row)
+        self.session.commit()
+
+    def close(self):
+        self.session.close()
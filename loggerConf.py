@@ -1,22 +1,123 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
+
+from scripts_config import ScriptConfig as Config
+
+LOG_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Logger for high-volume per-file messages on the upload path, subject to sampling
+FILE_LOGGER = "upload.file"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message.
+
+    The stock prepare() formats the record and folds the traceback into msg,
+    which loses the separate exc_info field in JSON output. Here the message
+    and traceback are rendered separately, so the record still pickles and
+    queues cleanly, and the listener's formatter decides how to lay them out.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 of every Config.LOG_SAMPLE_RATE records below WARNING"""
+
+    def __init__(self):
+        super().__init__()
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        rate = Config.LOG_SAMPLE_RATE
+        if rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        return next(self.counter) % rate == 0
+
+
+def parse_levels(spec):
+    # "upload.file=WARNING,sqlalchemy.engine=INFO" -> {"upload.file": "WARNING", ...}
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not name or not isinstance(logging.getLevelName(level), int):
+            logging.warning(f"Ignoring invalid LOG_LEVELS entry: {item!r}")
+            continue
+        levels[name] = level
+    return levels
+
 
 def setlogger():
-    # Configure logging
-    logging.basicConfig(level=logging.INFO,
-                        format="%(asctime)s %(levelname)s: %(message)s",
-                        datefmt="%Y-%m-%d %H:%M:%S")
+    formatter = JsonFormatter() if Config.LOG_FORMAT == "json" else logging.Formatter(LOG_FORMAT, DATE_FORMAT)
 
     # File handler
-    file_handler = logging.FileHandler('/data/uploader.log')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S"))
+    file_handler = logging.handlers.RotatingFileHandler(Config.LOG_FILE,
+                                                        maxBytes=Config.LOG_MAX_BYTES,
+                                                        backupCount=Config.LOG_BACKUP_COUNT)
+    file_handler.setFormatter(formatter)
 
     # Console handler
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S"))
+    console_handler.setFormatter(formatter)
 
-    # Get the root logger and add handlers
+    # Handlers pass everything through; levels are decided per logger (root INFO, LOG_LEVELS overrides)
     logger = logging.getLogger()
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.setLevel(logging.INFO)
+
+    # Module-level logging before this point installs an implicit basicConfig stderr handler,
+    # which would write every record synchronously a second time
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    listener = None
+    if Config.LOG_ASYNC:
+        # Only enqueueing happens on the caller's thread, the listener thread does the I/O
+        log_queue = queue.Queue(-1)
+        logger.addHandler(StructuredQueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                  respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
+
+    # Sampling sits on the logger so dropped records are never formatted or enqueued
+    logging.getLogger(FILE_LOGGER).addFilter(SamplingFilter())
+
+    for name, level in parse_levels(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    return listener
@@ -2,6 +2,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import logging, pysqlite3
+from scripts_config import ScriptConfig as Config
 
 try:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,7 +12,7 @@ try:
 
     # Ensure the database directory exists
     os.makedirs(DATABASE_DIR, exist_ok=True)
-    engine = create_engine(f"sqlite+pysqlite:///{DATABASE_PATH}", echo=True, module=pysqlite3)
+    engine = create_engine(f"sqlite+pysqlite:///{DATABASE_PATH}", echo=Config.SQL_ECHO, module=pysqlite3)
     logging.info(f"Database engine: {engine}")
 
     Session = sessionmaker(bind=engine)
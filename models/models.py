@@ -18,3 +18,25 @@ class UploadMon(Base):
     path = Column(String)
     update_date_time = Column(String)
 
+
+class UploadedObject(Base):
+    __tablename__ = 'uploaded_objects'
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, unique=True, index=True)
+    storage_class = Column(String)
+    size = Column(Integer)
+    upload_date_time = Column(String, index=True)
+
+class LogOffset(Base):
+    __tablename__ = 'log_offsets'
+
+    id = Column(Integer, primary_key=True)
+    device = Column(Integer)
+    inode = Column(Integer, index=True)
+    folder = Column(String, index=True)
+    name = Column(String)
+    path = Column(String)
+    epoch = Column(Integer)
+    offset = Column(Integer)
+    update_date_time = Column(String)
@@ -2,17 +2,22 @@ import json
 import subprocess
 import sys
 import boto3
+from boto3.s3.transfer import TransferConfig
 import os
 import logging
 import time
 import threading
 import hashlib
+import io
 
+from lifecycle_manager import record_upload, storage_class_for
+from loggerConf import FILE_LOGGER
 from scripts_config import ScriptConfig as Config
 from datetime import datetime, date
 
 # Define a lock for synchronization
 credentials_lock = threading.Lock()
+file_log = logging.getLogger(FILE_LOGGER)
 
 class S3UploadMaxRetryReached(Exception):
     def __init__(self, message):
@@ -50,28 +55,36 @@ class MoveFile:
         self.secret_key = secret_key
         self.session_token = session_token
 
-    def upload_file(self, src, dst):
+    def upload_file(self, src, dst, span=None):
         try:
             object_name = os.path.basename(src)
             dst = f"my_backup/{object_name}"
             bucket = Config.BUCKET_NAME
-            logging.info(f"Uploading started for {src} to {dst}")
-            self.s3.upload_file(src, bucket, dst)
+            storage_class = storage_class_for(src)
+            file_log.info("Uploading started for %s to %s", src, dst)
+            self.s3.upload_file(src, bucket, dst, ExtraArgs={"StorageClass": storage_class}, Config=transfer_config())
+            if span:
+                span.mark("uploaded")
+            record_upload(dst, storage_class, os.path.getsize(src))
+            if span:
+                span.mark("indexed")
             upload_date_time = datetime.now().isoformat()
             file_date_time = date.today().isoformat()
-            logging.info(f"Uploaded file {src} to S3 object {dst}")
+            file_log.info("Uploaded file %s to S3 object %s", src, dst)
             mime_type = subprocess.getoutput(f"file --brief --mime-type {src}")
 
-            logging.info(f"Updating log file with details {object_name} {mime_type} {file_date_time} {upload_date_time}")
+            file_log.info("Updating log file with details %s %s %s %s", object_name, mime_type, file_date_time, upload_date_time)
             activity_log(object_name, mime_type, file_date_time, upload_date_time)
-            logging.info(f"Log file updated")
+            file_log.info("Log file updated")
+            if span:
+                span.mark("logged")
 
         except boto3.exceptions.S3UploadFailedError as error:
             if "InvalidToken" or "ExpiredToken" in str(error):
                 access_key_request_log(datetime.now().isoformat())
                 if self.retry_count <= 3:
                     self.retry_count += 1
-                    self.handle_exception(src, dst)
+                    self.handle_exception(src, dst, span)
                 else:
                     logging.exception(f"Max retry count reached for {src} to {dst}. Skipping for now")
                     raise S3UploadMaxRetryReached("Maximum retry limit reached for S3 upload operation.")
@@ -81,7 +94,16 @@ class MoveFile:
         except Exception as error:
             logging.exception(f"Error uploading file {src} to S3: {error}")
 
-    def handle_exception(self, src, dst):
+    def upload_segment(self, src, body, dst):
+        # Errors propagate so the caller can retry the same byte range later
+        storage_class = storage_class_for(src)
+        file_log.info("Uploading segment of %s to %s", src, dst)
+        self.s3.upload_fileobj(io.BytesIO(body), Config.BUCKET_NAME, dst,
+                               ExtraArgs={"StorageClass": storage_class}, Config=transfer_config())
+        record_upload(dst, storage_class, len(body))
+        activity_log(dst, "application/gzip", date.today().isoformat(), datetime.now().isoformat())
+
+    def handle_exception(self, src, dst, span=None):
         expired_key_cache_file = "expired_key_cache.json"
         with open(expired_key_cache_file, "w") as cache_file:
             json.dump(
@@ -97,7 +119,15 @@ class MoveFile:
         self.update_aws_credentials(new_access_key, new_secret_key, new_session_token)
 
         # Retry the file upload using the updated AWS credentials
-        self.upload_file(src, dst)
+        self.upload_file(src, dst, span)
+
+
+def transfer_config():
+    # Built per upload so runtime changes to the tunables apply to the next file
+    return TransferConfig(
+        max_concurrency=Config.UPLOAD_MAX_CONCURRENCY,
+        max_bandwidth=Config.UPLOAD_MAX_BANDWIDTH or None,
+    )
 
 
 def ensure_directory_exists(directory_path):
@@ -108,7 +138,7 @@ def ensure_directory_exists(directory_path):
         except OSError as e:
             logging.error(f"Failed to create directory {directory_path}: {e}")
     else:
-        logging.info(f"Directory already exists: {directory_path}")
+        logging.debug("Directory already exists: %s", directory_path)
 
 def move_json(json_obj):
     json_str = json.dumps(json_obj)  # Convert dictionary to JSON-formatted string
@@ -131,7 +161,7 @@ def move_json(json_obj):
     log_file = os.path.join(Config.UPLOAD_ACTIVITY_LOGS,f"activity_{datetime.now().isoformat().replace(' ', '_')}_{md5_hash}.json",)
     try:
         os.rename(log_file_tmp, log_file)
-        logging.info(f"Activity log committed, to {log_file}")
+        file_log.info("Activity log committed, to %s", log_file)
     except OSError as error:
         os.remove(log_file_tmp)
         logging.error(f"Error occurred: {error}, Failed to commit {log_file}")
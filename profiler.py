@@ -0,0 +1,123 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from scripts_config import ScriptConfig as Config
+
+
+# Shorter intervals turn the sampler into a busy loop holding the GIL
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads and aggregates them as collapsed stacks.
+
+    The output is one "thread;outer;...;inner count" line per unique stack, the
+    format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started_at = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds, interval):
+        with self.lock:
+            if self.is_running():
+                raise RuntimeError("Profiler is already running")
+            self.samples = Counter()
+            self.stop_event.clear()
+            self.started_at = datetime.now().isoformat()
+            self.thread = threading.Thread(target=self.run, args=(seconds, interval), name="profiler", daemon=True)
+            self.thread.start()
+        logging.info(f"Profiler started for {seconds} seconds, sampling every {interval} seconds")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self, seconds, interval):
+        deadline = time.monotonic() + seconds
+        own_ident = threading.get_ident()
+        while time.monotonic() < deadline and not self.stop_event.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self.samples[collapse(names.get(ident, str(ident)), frame)] += 1
+        logging.info("Profiler stopped")
+
+    def snapshot(self):
+        # dict.copy is atomic under the GIL, so this is safe while the sampler is still running
+        return dict.copy(self.samples)
+
+    def collapsed(self):
+        samples = self.snapshot()
+        return "".join(f"{stack} {samples[stack]}\n" for stack in sorted(samples, key=samples.get, reverse=True))
+
+    def status(self):
+        return {"running": self.is_running(), "started_at": self.started_at, "samples": sum(self.snapshot().values())}
+
+
+def collapse(thread_name, frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join([thread_name] + stack[::-1])
+
+
+class JobSpan:
+    """Timestamps of the stages a single upload job went through"""
+
+    def __init__(self, path, queued_at=None):
+        self.path = path
+        self.stages = [("queued", queued_at or time.time())]
+
+    def mark(self, stage):
+        self.stages.append((stage, time.time()))
+
+    def to_dict(self):
+        started = self.stages[0][1]
+        return {
+            "path": self.path,
+            "started_at": datetime.fromtimestamp(started).isoformat(),
+            # Milliseconds since the job was queued
+            "stages": {stage: round((timestamp - started) * 1000, 3) for stage, timestamp in self.stages},
+        }
+
+
+job_spans = deque(maxlen=Config.PROFILE_JOB_HISTORY)
+profiler = SamplingProfiler()
+
+
+def start_job(path, queued_at=None):
+    span = JobSpan(path, queued_at)
+    job_spans.append(span)
+    return span
+
+
+def recent_jobs():
+    return [span.to_dict() for span in list(job_spans)]
+
+
+def thread_dump():
+    names = {thread.ident: thread for thread in threading.enumerate()}
+    dump = []
+    for ident, frame in sys._current_frames().items():
+        thread = names.get(ident)
+        name = thread.name if thread else str(ident)
+        daemon = " daemon" if thread and thread.daemon else ""
+        dump.append(f'Thread "{name}" ({ident}){daemon}\n' + "".join(traceback.format_stack(frame)))
+    return "\n".join(dump)
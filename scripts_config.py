@@ -1,3 +1,5 @@
+import json
+import logging
 import os
 
 
@@ -62,3 +64,139 @@ class ScriptConfig:
 
     ARCHIVE_PURGE_INTERVAL = int(os.environ.get("ARCHIVE_EXPIRE_DAYS", 30))  # in days
     print(f"ARCHIVE_PURGE_INTERVAL: {ARCHIVE_PURGE_INTERVAL}")
+
+    DEFAULT_STORAGE_CLASS = os.environ.get("DEFAULT_STORAGE_CLASS", "STANDARD")
+    print(f"DEFAULT_STORAGE_CLASS: {DEFAULT_STORAGE_CLASS}")
+
+    # Storage class per source folder, e.g. "/data/out/videos=STANDARD_IA,/data/out/archive=GLACIER_IR"
+    STORAGE_CLASS_RULES = dict(
+        rule.strip().split("=", 1)
+        for rule in os.environ.get("STORAGE_CLASS_RULES", f"{OUT_VIDEO_DIR}=STANDARD_IA,{DAIS_VIDEO_DIR}=STANDARD_IA").split(",")
+        if "=" in rule
+    )
+    print(f"STORAGE_CLASS_RULES: {STORAGE_CLASS_RULES}")
+
+    ARCHIVE_TRANSITION_DAYS = int(os.environ.get("ARCHIVE_TRANSITION_DAYS", 0))  # in days, 0 = never
+    print(f"ARCHIVE_TRANSITION_DAYS: {ARCHIVE_TRANSITION_DAYS}")
+
+    ARCHIVE_STORAGE_CLASS = os.environ.get("ARCHIVE_STORAGE_CLASS", "GLACIER_IR")
+    print(f"ARCHIVE_STORAGE_CLASS: {ARCHIVE_STORAGE_CLASS}")
+
+    LIFECYCLE_CHECK_INTERVAL = int(os.environ.get("LIFECYCLE_CHECK_INTERVAL", 3600))  # Seconds ~1 Hour
+    print(f"LIFECYCLE_CHECK_INTERVAL: {LIFECYCLE_CHECK_INTERVAL}")
+
+    LIFECYCLE_BATCH_SIZE = 1000  # Max keys per S3 delete_objects call
+    print(f"LIFECYCLE_BATCH_SIZE: {LIFECYCLE_BATCH_SIZE}")
+
+    LOG_SHIP_ENABLED = bool(os.environ.get("LOG_SHIP_ENABLED", False))  # Enable/null(Disable)
+    print(f"LOG_SHIP_ENABLED: {LOG_SHIP_ENABLED}")
+
+    LOG_SHIP_INTERVAL = int(os.environ.get("LOG_SHIP_INTERVAL", 60))  # Seconds ~1 Min
+    print(f"LOG_SHIP_INTERVAL: {LOG_SHIP_INTERVAL}")
+
+    LOG_SHIP_SEGMENT_BYTES = int(os.environ.get("LOG_SHIP_SEGMENT_BYTES", 8 * 1024 * 1024))  # Bytes ~8 MB
+    print(f"LOG_SHIP_SEGMENT_BYTES: {LOG_SHIP_SEGMENT_BYTES}")
+
+    LOG_SHIP_IDLE_DELETE = int(os.environ.get("LOG_SHIP_IDLE_DELETE", 0))  # Seconds, 0 = keep shipped files
+    print(f"LOG_SHIP_IDLE_DELETE: {LOG_SHIP_IDLE_DELETE}")
+
+    DEBUG_ENDPOINTS_ENABLED = bool(os.environ.get("DEBUG_ENDPOINTS_ENABLED", False))  # Enable/null(Disable)
+    print(f"DEBUG_ENDPOINTS_ENABLED: {DEBUG_ENDPOINTS_ENABLED}")
+
+    PROFILE_JOB_HISTORY = int(os.environ.get("PROFILE_JOB_HISTORY", 200))  # Upload jobs kept for /debug/jobs
+    print(f"PROFILE_JOB_HISTORY: {PROFILE_JOB_HISTORY}")
+
+    PROFILE_MAX_SECONDS = int(os.environ.get("PROFILE_MAX_SECONDS", 300))  # Seconds ~5 Min
+    print(f"PROFILE_MAX_SECONDS: {PROFILE_MAX_SECONDS}")
+
+    UPLOAD_MAX_CONCURRENCY = int(os.environ.get("UPLOAD_MAX_CONCURRENCY", 10))  # Threads per upload
+    print(f"UPLOAD_MAX_CONCURRENCY: {UPLOAD_MAX_CONCURRENCY}")
+
+    UPLOAD_MAX_BANDWIDTH = int(os.environ.get("UPLOAD_MAX_BANDWIDTH", 0))  # Bytes/sec, 0 = unlimited
+    print(f"UPLOAD_MAX_BANDWIDTH: {UPLOAD_MAX_BANDWIDTH}")
+
+    RUNTIME_CONFIG_FILE = os.environ.get("RUNTIME_CONFIG_FILE", "/data/runtime_config.json")
+    print(f"RUNTIME_CONFIG_FILE: {RUNTIME_CONFIG_FILE}")
+
+    LOG_FILE = os.environ.get("LOG_FILE", "/data/uploader.log")
+    print(f"LOG_FILE: {LOG_FILE}")
+
+    LOG_ASYNC = bool(os.environ.get("LOG_ASYNC", "Enable"))  # Enable/null(Disable)
+    print(f"LOG_ASYNC: {LOG_ASYNC}")
+
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")  # text/json
+    print(f"LOG_FORMAT: {LOG_FORMAT}")
+
+    LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))  # Bytes ~10 MB
+    print(f"LOG_MAX_BYTES: {LOG_MAX_BYTES}")
+
+    LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+    print(f"LOG_BACKUP_COUNT: {LOG_BACKUP_COUNT}")
+
+    LOG_LEVELS = os.environ.get("LOG_LEVELS", "")  # e.g. "upload.file=WARNING,sqlalchemy.engine=INFO"
+    print(f"LOG_LEVELS: {LOG_LEVELS}")
+
+    LOG_SAMPLE_RATE = int(os.environ.get("LOG_SAMPLE_RATE", 1))  # Keep 1 of every N per-file messages
+    print(f"LOG_SAMPLE_RATE: {LOG_SAMPLE_RATE}")
+
+    SQL_ECHO = bool(os.environ.get("SQL_ECHO", False))  # Enable/null(Disable)
+    print(f"SQL_ECHO: {SQL_ECHO}")
+
+    # Tunables that can be changed at runtime (via /config or SIGHUP): type, minimum and maximum
+    RELOADABLE = {
+        "MIN_PROCESS_INTERVAL": (int, 1, 86400),  # Seconds, up to 1 day
+        "MEMORY_CHECK_INTERVAL": (int, 1, 86400),  # Seconds, up to 1 day
+        "PURGE_THRESHOLD_PERCENTAGE": (float, 0, 100),
+        "PURGE_INTERVAL": (int, 1, 3650),  # Days, up to 10 years
+        "PURGE_RESUME_PERCENTAGE": (float, 0, 100),
+        "ARCHIVE_PURGE_INTERVAL": (int, 0, 3650),  # Days, 0 = never expire
+        "ARCHIVE_TRANSITION_DAYS": (int, 0, 3650),  # Days, 0 = never transition
+        "LIFECYCLE_CHECK_INTERVAL": (int, 1, 7 * 86400),  # Seconds, up to 1 week
+        "UPLOAD_MAX_CONCURRENCY": (int, 1, 100),
+        "UPLOAD_MAX_BANDWIDTH": (int, 0, 10 ** 10),  # Bytes/sec, 0 = unlimited
+        "LOG_SAMPLE_RATE": (int, 1, 10 ** 6),
+        "LOG_SHIP_INTERVAL": (int, 1, 86400),  # Seconds, up to 1 day
+        "LOG_SHIP_SEGMENT_BYTES": (int, 1, 1024 ** 3),  # Bytes, a segment is held in memory
+        "LOG_SHIP_IDLE_DELETE": (int, 0, 30 * 86400),  # Seconds, 0 = keep shipped files
+    }
+
+    @classmethod
+    def tunables(cls):
+        return {name: getattr(cls, name) for name in cls.RELOADABLE}
+
+    @classmethod
+    def update(cls, values):
+        """Validate and apply runtime tunables, returns the applied values"""
+        unknown = set(values) - set(cls.RELOADABLE)
+        if unknown:
+            raise ValueError(f"Unknown or non-reloadable settings: {sorted(unknown)}")
+
+        # Validate everything first so a bad value doesn't leave a half-applied update
+        applied = {name: cls.validate(name, value) for name, value in values.items()}
+        for name, value in applied.items():
+            setattr(cls, name, value)
+            logging.info(f"Config updated: {name}={value}")
+        return applied
+
+    @classmethod
+    def validate(cls, name, value):
+        cast, minimum, maximum = cls.RELOADABLE[name]
+        if isinstance(value, bool):
+            raise ValueError(f"{name} must be a number, got {value}")
+        # is_integer() is also False for inf and NaN; strings like "2.9" fail in int() below
+        if cast is int and isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"{name} must be a whole number, got {value}")
+        value = cast(value)
+        # Written as "not (...)" so NaN is rejected too
+        if not (minimum <= value <= maximum):
+            raise ValueError(f"{name} must be between {minimum} and {maximum}, got {value}")
+        return value
+
+    @classmethod
+    def reload(cls):
+        """Re-read tunables from RUNTIME_CONFIG_FILE, if present"""
+        if not os.path.exists(cls.RUNTIME_CONFIG_FILE):
+            logging.info(f"No runtime config at {cls.RUNTIME_CONFIG_FILE}, keeping current values")
+            return {}
+        with open(cls.RUNTIME_CONFIG_FILE, "r") as config_file:
+            return cls.update(json.load(config_file))
@@ -5,10 +5,14 @@ import time
 import zipfile
 import pyinotify
 
+from log_shipper import is_shipped_log, ship_logs
+from loggerConf import FILE_LOGGER
 from scripts_config import ScriptConfig as Config
 from mv_file import MoveFile
+from profiler import start_job
 
 mv_service = MoveFile()
+file_log = logging.getLogger(FILE_LOGGER)
 shutdown_event = threading.Event()
 
 
@@ -21,12 +25,14 @@ class EventHandler(pyinotify.ProcessEvent):
 
     def get_missed_files(self):
         # Check if there is any missed files
-        logging.info("Checking for missed files...")
+        file_log.info("Checking for missed files...")
         missed_files = []
         current_time = time.time()
 
         for filename in os.listdir(self.folder_path):
             file_path = os.path.join(self.folder_path, filename)
+            if is_shipped_log(file_path):
+                continue  # Tailed by LogShipper instead
             file_creation_time = os.path.getctime(file_path)
             if current_time - file_creation_time >= Config.MIN_PROCESS_INTERVAL:
                 missed_files.append(file_path)
@@ -35,42 +41,49 @@ class EventHandler(pyinotify.ProcessEvent):
 
     def process_missed_files(self):
         # Upload all missed file if not then return normally
-        logging.info("Processing missed files...")
+        file_log.info("Processing missed files...")
+        queued_at = time.time()
         missed_files = self.get_missed_files()
 
         if len(missed_files) == 0:
             return
 
         for file_path in missed_files:
+            # queued -> ready is the wait behind the missed files handled before this one
+            span = start_job(file_path, queued_at)
+            span.mark("ready")
             filename = file_path.split("/")[-1].split(".")[0]
             dst = os.path.basename(file_path)
             _, file_extension = os.path.splitext(file_path)
             file_extension = file_extension.lower()
             if any(file_extension.endswith(ext) for ext in (".log", ".json")):
                 zipped_file_path = self.zip_file(file_path, filename)
-                self.retry_upload_and_cleanup(zipped_file_path, dst)
+                span.mark("compressed")
+                self.retry_upload_and_cleanup(zipped_file_path, dst, span)
                 os.remove(file_path)
-                logging.info(f"Original log file removed: {file_path}")
+                span.mark("deleted")
+                file_log.info("Original log file removed: %s", file_path)
             else:
-                self.retry_upload_and_cleanup(file_path, dst)
-                logging.info(f"Original file removed {file_path}")
+                self.retry_upload_and_cleanup(file_path, dst, span)
+                span.mark("deleted")
+                file_log.info("Original file removed %s", file_path)
                 self.processed_files.add(file_path)
-                logging.info("Missed files processed successfully")
+                file_log.info("Missed files processed successfully")
 
     def wait_for_completion(self):
         # Wait for ongoing file uploads to complete before returning
         while self.processing_files:
             time.sleep(1)
 
-    def retry_upload_and_cleanup(self, file_path, dst):
+    def retry_upload_and_cleanup(self, file_path, dst, span=None):
         max_retries = 3
         retry_delay = 1
         for _ in range(max_retries):
             try:
-                mv_service.upload_file(file_path, dst)
+                mv_service.upload_file(file_path, dst, span)
                 if os.path.exists(file_path):
                     os.remove(file_path)
-                logging.info(f"File removed: {file_path}")
+                file_log.info("File removed: %s", file_path)
                 break  # Break out of the retry loop on success
             except Exception as e:
                 logging.warning(f"Upload failed: {e}. Retrying after {retry_delay} seconds.")
@@ -88,14 +101,18 @@ class EventHandler(pyinotify.ProcessEvent):
         # These events are handled by process_moved_to and process_created respectively.
         try:
             if event.mask & pyinotify.IN_MOVED_TO or event.mask & pyinotify.IN_CREATE:
+                # queued -> ready covers the missed files sweep that runs before this event's file
+                queued_at = time.time()
                 self.process_missed_files()
                 src = event.pathname
-                if src in self.processed_files or src in self.processing_files:
+                if src in self.processed_files or src in self.processing_files or is_shipped_log(src):
                     return
 
                 self.processing_files.add(src)  # Add current file to processing list
                 if os.path.exists(src) and os.path.isfile(src):
-                    logging.info(f"Event received for file: {src}")
+                    span = start_job(src, queued_at)
+                    span.mark("ready")
+                    file_log.info("Event received for file: %s", src)
                     filename = src.split("/")[-1].split(".")[0]
                     _, file_extension = os.path.splitext(src)
                     file_extension = file_extension.lower()
@@ -106,15 +123,17 @@ class EventHandler(pyinotify.ProcessEvent):
                     try:
                         if is_log_file:
                             zipped_file_path = self.zip_file(src, filename)
-                            self.retry_upload_and_cleanup(zipped_file_path, dst)
+                            span.mark("compressed")
+                            self.retry_upload_and_cleanup(zipped_file_path, dst, span)
                         else:
-                            self.retry_upload_and_cleanup(src, dst)
+                            self.retry_upload_and_cleanup(src, dst, span)
                         if os.path.exists(src):
                             os.remove(src)
+                        span.mark("deleted")
 
                     finally:
                         self.processing_files.remove(src)  # Remove current processed file from processing list
-                        logging.info("Event processed successfully")
+                        file_log.info("Event processed successfully")
 
         except Exception as e:
             logging.exception(f"Failed to process event: {e}")
@@ -126,6 +145,12 @@ def watch_folder_in_thread(folder_path, shutdown_event):
     handler = EventHandler(folder_path)
     notifier = pyinotify.Notifier(wm, handler)
     wm.add_watch(folder_path, mask, rec=True)
+    shipper = None
+    if Config.LOG_SHIP_ENABLED:
+        # Separate thread so shipping a log backlog never holds up this folder's events
+        shipper = threading.Thread(target=ship_logs, args=(folder_path, mv_service, shutdown_event),
+                                   name=f"shipper:{folder_path}")
+        shipper.start()
     logging.info(f"Monitoring started for folder: {folder_path}")
 
     try:
@@ -141,6 +166,9 @@ def watch_folder_in_thread(folder_path, shutdown_event):
         logging.info("Monitoring stopped by user.")
     finally:
         notifier.stop()
+        if shipper:
+            # A re-added folder waits on this thread, so the shipper must be done too
+            shipper.join()
         logging.info(f"Monitoring stopped for folder: {folder_path}")
 
 def graceful_shutdown(_, __):